@@ -18,11 +18,14 @@ use serde::{Deserialize, Serialize};
 use std::collections::{HashSet, HashMap};
 use std::env;
 use std::path::Path;
+use std::process::Stdio;
 use std::time::{Duration, SystemTime};
 use tempfile::TempDir;
 use tokio::fs::{self, OpenOptions};
 use tokio::io::{AsyncWriteExt, AsyncBufReadExt};
 use tokio::process::Command;
+use tokio::sync::mpsc;
+use tokio_stream::wrappers::ReceiverStream;
 use std::os::unix::fs::MetadataExt;
 use std::time::UNIX_EPOCH;
 
@@ -33,6 +36,14 @@ struct ExecuteRequest {
     env: Option<HashMap<String, String>>,
 }
 
+#[derive(Serialize)]
+#[serde(tag = "type", rename_all = "snake_case")]
+enum StreamFrame {
+    Stdout { data: String },
+    Stderr { data: String },
+    Exit { exit_code: i32, files: Vec<String> },
+}
+
 #[derive(Serialize)]
 struct ExecuteResult {
     stdout: String,
@@ -117,12 +128,10 @@ async fn get_changed_files(dir: &str, since: SystemTime) -> Vec<String> {
     changed_files
 }
 
-async fn execute(payload: web::Json<ExecuteRequest>) -> Result<HttpResponse, Error> {
-    let workspace = env::var("APP_WORKSPACE").unwrap_or_else(|_| "/workspace".to_string());
-    let execution_start_time = SystemTime::now();
+async fn prepare_script(source_code: &str) -> Result<TempDir, Error> {
     let source_dir = TempDir::new()?;
-    
-    tokio::fs::write(source_dir.path().join("script.py"), &payload.source_code).await?;
+
+    tokio::fs::write(source_dir.path().join("script.py"), source_code).await?;
     let guessed_deps = String::from_utf8_lossy(
         &Command::new("upm")
             .arg("guess")
@@ -147,6 +156,13 @@ async fn execute(payload: web::Json<ExecuteRequest>) -> Result<HttpResponse, Err
     }
 
     tokio::fs::rename(source_dir.path().join("script.py"), source_dir.path().join("script.xsh")).await?;
+    Ok(source_dir)
+}
+
+async fn execute(payload: web::Json<ExecuteRequest>) -> Result<HttpResponse, Error> {
+    let workspace = env::var("APP_WORKSPACE").unwrap_or_else(|_| "/workspace".to_string());
+    let execution_start_time = SystemTime::now();
+    let source_dir = prepare_script(&payload.source_code).await?;
     
     let timeout = Duration::from_secs(payload.timeout.unwrap_or(60));
     let mut cmd = Command::new("xonsh"); // TODO: manually switch between python and shell for ~80ms perf gain
@@ -178,6 +194,88 @@ async fn execute(payload: web::Json<ExecuteRequest>) -> Result<HttpResponse, Err
     }))
 }
 
+async fn send_frame(tx: &mpsc::Sender<Result<web::Bytes, std::io::Error>>, frame: StreamFrame) {
+    let mut line = serde_json::to_vec(&frame).unwrap();
+    line.push(b'\n');
+    let _ = tx.send(Ok(web::Bytes::from(line))).await;
+}
+
+// Same as `execute`, but output is sent as NDJSON frames while the script runs
+async fn execute_stream(payload: web::Json<ExecuteRequest>) -> Result<HttpResponse, Error> {
+    let workspace = env::var("APP_WORKSPACE").unwrap_or_else(|_| "/workspace".to_string());
+    let execution_start_time = SystemTime::now();
+    let source_dir = prepare_script(&payload.source_code).await?;
+
+    let timeout = Duration::from_secs(payload.timeout.unwrap_or(60));
+    let mut cmd = Command::new("xonsh");
+    cmd.arg(source_dir.path().join("script.xsh"))
+        .stdout(Stdio::piped())
+        .stderr(Stdio::piped())
+        .kill_on_drop(true);
+    if let Some(env) = &payload.env { cmd.envs(env); }
+    let mut child = cmd.spawn()?;
+    let mut stdout = tokio::io::BufReader::new(child.stdout.take().unwrap());
+    let mut stderr = tokio::io::BufReader::new(child.stderr.take().unwrap());
+
+    let (tx, rx) = mpsc::channel(64);
+    actix_web::rt::spawn(async move {
+        let _source_dir = source_dir; // keep the script around until the process exits
+        let deadline = tokio::time::sleep(timeout);
+        tokio::pin!(deadline);
+        let (mut stdout_buf, mut stderr_buf) = (Vec::new(), Vec::new());
+        let (mut stdout_done, mut stderr_done, mut timed_out) = (false, false, false);
+
+        while !(stdout_done && stderr_done) {
+            tokio::select! {
+                read = stdout.read_until(b'\n', &mut stdout_buf), if !stdout_done => {
+                    if matches!(read, Ok(0) | Err(_)) { stdout_done = true; }
+                    if !stdout_buf.is_empty() {
+                        let data = String::from_utf8_lossy(&stdout_buf).to_string();
+                        stdout_buf.clear();
+                        send_frame(&tx, StreamFrame::Stdout { data }).await;
+                    }
+                }
+                read = stderr.read_until(b'\n', &mut stderr_buf), if !stderr_done => {
+                    if matches!(read, Ok(0) | Err(_)) { stderr_done = true; }
+                    if !stderr_buf.is_empty() {
+                        let data = String::from_utf8_lossy(&stderr_buf).to_string();
+                        stderr_buf.clear();
+                        send_frame(&tx, StreamFrame::Stderr { data }).await;
+                    }
+                }
+                _ = &mut deadline => {
+                    timed_out = true;
+                    break;
+                }
+            }
+        }
+
+        // closing both pipes does not mean the process exited, so waiting stays under the deadline
+        let exit_code = if timed_out {
+            None
+        } else {
+            tokio::select! {
+                status = child.wait() => Some(status.ok().and_then(|status| status.code()).unwrap_or(-1)),
+                _ = &mut deadline => None,
+            }
+        };
+        let exit_code = match exit_code {
+            Some(exit_code) => exit_code,
+            None => {
+                let _ = child.kill().await;
+                send_frame(&tx, StreamFrame::Stderr { data: "Execution timed out".to_string() }).await;
+                -1
+            }
+        };
+        let files = get_changed_files(&workspace, execution_start_time).await;
+        send_frame(&tx, StreamFrame::Exit { exit_code, files }).await;
+    });
+
+    Ok(HttpResponse::Ok()
+        .content_type("application/x-ndjson")
+        .streaming(ReceiverStream::new(rx)))
+}
+
 #[actix_web::main]
 async fn web() -> std::io::Result<()> {
     env_logger::init_from_env(env_logger::Env::new().default_filter_or("info"));
@@ -189,6 +287,7 @@ async fn web() -> std::io::Result<()> {
             .route("/workspace/{path:.*}", web::put().to(upload_file))
             .route("/workspace/{path:.*}", web::get().to(download_file))
             .route("/execute", web::post().to(execute))
+            .route("/execute-stream", web::post().to(execute_stream))
     })
     .bind(&listen_addr)?
     .run()
@@ -13,28 +13,61 @@
 # limitations under the License.
 
 import asyncio
-import aiorun
+import contextlib
+import signal
 import uvicorn
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 from code_interpreter.application_context import ApplicationContext
 
 
 async def main():
     ctx = ApplicationContext()
-    
-    http_task = uvicorn.Server(
+    host, port = ctx.config.http_host_port
+
+    http_server = uvicorn.Server(
         uvicorn.Config(
             ctx.http_server,
-            host=ctx.config.http_listen_addr.split(":")[0],
-            port=int(ctx.config.http_listen_addr.split(":")[1]),
-            loop="asyncio",
+            host=host,
+            port=port,
+            loop="uvloop" if uvloop else "asyncio",
+            http="httptools" if uvloop else "auto",
+            interface="asgi3",
+            access_log=False,
         )
-    ).serve()
-    
-    tasks = [http_task]
-    if ctx.config.grpc_enabled:
-        tasks.append(ctx.grpc_server.start(listen_addr=ctx.config.grpc_listen_addr))
-    
-    await asyncio.gather(*tasks)
-
-aiorun.run(main())
+    )
+
+    # a failure in either server cancels the other, so the pod exits and gets restarted
+    loop = asyncio.get_running_loop()
+    try:
+        async with asyncio.TaskGroup() as tg:
+            http_task = tg.create_task(http_server.serve(), name="http")
+            grpc_task = None
+            if ctx.config.grpc_enabled:
+                grpc_task = tg.create_task(
+                    ctx.grpc_server.start(listen_addr=ctx.config.grpc_listen_addr),
+                    name="grpc",
+                )
+
+            def shutdown() -> None:
+                http_server.should_exit = True
+                # cancel once only, a second cancel would interrupt the server's graceful stop
+                if grpc_task and not grpc_task.cancelling():
+                    grpc_task.cancel()
+
+            # stop both servers on SIGTERM/SIGINT, and gRPC once uvicorn has exited on its own
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                with contextlib.suppress(NotImplementedError):
+                    loop.add_signal_handler(sig, shutdown)
+            http_task.add_done_callback(lambda _: shutdown())
+    finally:
+        await ctx.code_executor.aclose()
+
+if uvloop:
+    uvloop.run(main())
+else:
+    asyncio.run(main())
@@ -17,10 +17,17 @@ from contextvars import ContextVar
 import logging
 import logging.config
 from functools import cached_property
+import hashlib
+import importlib.util
 
 import os
+import pathlib
+import stat
+import tempfile
+from typing import Any, Callable
 from fastapi import FastAPI
 import grpc
+import orjson
 from code_interpreter.config import Config
 from code_interpreter.services.custom_tool_executor import CustomToolExecutor
 from code_interpreter.services.grpc_server import GrpcServer
@@ -32,6 +39,8 @@ from code_interpreter.services.kubectl import Kubectl
 from code_interpreter.services.kubernetes_code_executor import KubernetesCodeExecutor
 from code_interpreter.services.storage import Storage
 
+logger = logging.getLogger("application_context")
+
 
 class ApplicationContext:
     def __init__(self) -> None:
@@ -126,10 +135,56 @@ class ApplicationContext:
             server_credentials=self.grpc_server_credentials
         )
 
+    @cached_property
+    def schema_validator(self) -> Callable[[Any], Any] | None:
+        if not self.config.schema_path:
+            return None
+
+        # only deployments with a schema pay for importing the code generator
+        import fastjsonschema
+
+        schema = pathlib.Path(self.config.schema_path).read_bytes()
+        options = {"use_default": True, "detailed_exceptions": False}
+        definition = orjson.loads(schema)
+
+        # generated validator code is cached in a private per-user directory, keyed by schema content,
+        # generator version and options, so restarts and sibling workers import it instead of re-running the code generator
+        cache_dir = pathlib.Path(tempfile.gettempdir()) / f"code-interpreter-schema-cache-{os.geteuid()}"
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            cache_stat = cache_dir.lstat()
+        except OSError:
+            cache_stat = None
+        if (
+            cache_stat is None
+            or not stat.S_ISDIR(cache_stat.st_mode)
+            or cache_stat.st_uid != os.geteuid()
+            or cache_stat.st_mode & 0o077
+        ):
+            # never import code from a directory someone else could write to
+            logger.warning("Schema cache directory %s is not private, compiling the schema in memory", cache_dir)
+            return fastjsonschema.compile(definition, **options)
+
+        key = hashlib.sha256(schema)
+        key.update(fastjsonschema.VERSION.encode())
+        key.update(repr(sorted(options.items())).encode())
+        cache_file = cache_dir / f"schema_{key.hexdigest()[:32]}.py"
+        if not cache_file.exists():
+            code = fastjsonschema.compile_to_code(definition, **options)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(code)
+            os.replace(tmp_file, cache_file)
+
+        spec = importlib.util.spec_from_file_location(cache_file.stem, cache_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.validate
+
     @cached_property
     def http_server(self) -> FastAPI:
         return create_http_server(
             code_executor=self.code_executor,
             custom_tool_executor=self.custom_tool_executor,
             request_id_context_var=self.request_id_context_var,
+            schema_validator=self.schema_validator,
         )
@@ -14,7 +14,7 @@
 
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import validator
+from pydantic import AliasChoices, Field, computed_field, field_validator
 
 
 class Config(BaseSettings):
@@ -51,8 +51,10 @@ class Config(BaseSettings):
     # enable/disable GRPC
     grpc_enabled: bool = False
 
-    # path to schema (if it exists)
-    schema_path: str = ""
+    # path to schema (if it exists), BEE_SCHEMA_PATH is accepted for backwards compatibility
+    schema_path: str = Field(
+        default="", validation_alias=AliasChoices("APP_SCHEMA_PATH", "BEE_SCHEMA_PATH")
+    )
 
     # the address and port gRPC server will listen on
     grpc_listen_addr: str = "0.0.0.0:50051"
@@ -101,4 +103,25 @@ class Config(BaseSettings):
 
     file_size_limit: str = "1Gi"
 
-
+    # largest /v1/execute and /v1/execute-stream request body accepted
+    execute_body_size_limit: str = "10Mi"
+
+    @field_validator("grpc_listen_addr", "http_listen_addr")
+    @classmethod
+    def validate_listen_addr(cls, value: str) -> str:
+        host, sep, port = value.rpartition(":")
+        if not sep or not host or not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"Expected 'host:port', got {value!r}")
+        return value
+
+    @computed_field
+    @property
+    def http_host_port(self) -> tuple[str, int]:
+        host, _, port = self.http_listen_addr.rpartition(":")
+        return host, int(port)
+
+    @computed_field
+    @property
+    def grpc_host_port(self) -> tuple[str, int]:
+        host, _, port = self.grpc_listen_addr.rpartition(":")
+        return host, int(port)
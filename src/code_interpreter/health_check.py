@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import socket
 import httpx
 from code_interpreter.config import Config
 
@@ -22,7 +23,7 @@ def health_check():
     """
     config = Config()
     
-    if getattr(config, 'grpc_enabled', True):
+    if config.grpc_enabled:
         try:
             return grpc_health_check(config)
         except Exception as e:
@@ -32,32 +33,39 @@ def health_check():
     return http_health_check(config)
 
 
-def grpc_health_check(config):
+def _grpc_channel(listen_addr, tls_cert, tls_cert_key, tls_ca_cert):
     import grpc
+
+    if not tls_cert or not tls_cert_key or not tls_ca_cert:
+        return grpc.insecure_channel(listen_addr)
+    return grpc.secure_channel(
+        listen_addr,
+        grpc.ssl_channel_credentials(
+            root_certificates=tls_ca_cert,
+            private_key=tls_cert_key,
+            certificate_chain=tls_cert,
+        ),
+    )
+
+
+def grpc_health_check(config):
     from proto.code_interpreter.v1.code_interpreter_service_pb2 import ExecuteRequest
     from proto.code_interpreter.v1.code_interpreter_service_pb2_grpc import CodeInterpreterServiceStub
 
-    if (
-        not config.grpc_tls_cert
-        or not config.grpc_tls_cert_key
-        or not config.grpc_tls_ca_cert
-    ):
-        channel = grpc.insecure_channel(config.grpc_listen_addr)
-    else:
-        channel = grpc.secure_channel(
-            config.grpc_listen_addr,
-            grpc.ssl_server_credentials(
-                private_key_certificate_chain_pairs=[
-                    (config.grpc_tls_cert_key, config.grpc_tls_cert)
-                ],
-                root_certificates=config.grpc_tls_ca_cert,
-            ),
-        )
+    # fail fast if nothing is listening, rather than waiting out the RPC timeout
+    socket.create_connection(config.grpc_host_port, timeout=0.5).close()
 
-    result = CodeInterpreterServiceStub(channel).Execute(
-        ExecuteRequest(source_code="print(21 * 2)"),
-        timeout=30,
-    )
+    # the check runs once per process, so the channel is closed rather than kept around
+    with _grpc_channel(
+        config.grpc_listen_addr,
+        config.grpc_tls_cert,
+        config.grpc_tls_cert_key,
+        config.grpc_tls_ca_cert,
+    ) as channel:
+        result = CodeInterpreterServiceStub(channel).Execute(
+            ExecuteRequest(source_code="print(21 * 2)"),
+            timeout=30,
+        )
     
     assert result.stdout == "42\n", f"Expected '42\n', got '{result.stdout}'"
     assert result.exit_code == 0, f"Expected exit code 0, got {result.exit_code}"
@@ -76,11 +84,13 @@ def http_health_check(config):
         "chat_id": "health_check"
     }
     
-    response = httpx.post(
-        f"{http_base_url}/v1/execute", 
-        json=payload,
-        timeout=30.0
-    )
+    # the check runs once per process, so the client is closed rather than kept around
+    with httpx.Client(
+        base_url=http_base_url,
+        timeout=30.0,
+        transport=httpx.HTTPTransport(retries=0),
+    ) as client:
+        response = client.post("/v1/execute", json=payload)
     
     # Validate the response
     response.raise_for_status()
@@ -59,7 +59,9 @@ class CodeInterpreterServicer(code_interpreter_pb2_grpc.CodeInterpreterServiceSe
     ) -> code_interpreter_pb2.ExecuteResponse:
         self.request_id_context_var.set(str(uuid.uuid4()))
         logger.info(
-            "Executing code with files %s: %s", request.files, request.source_code
+            "Executing code (%d bytes, %d files)",
+            len(request.source_code),
+            len(request.files),
         )
         await self._validate_request(request, context)
 
@@ -72,7 +74,13 @@ class CodeInterpreterServicer(code_interpreter_pb2_grpc.CodeInterpreterServiceSe
             logger.exception("Error executing code")
             raise e
 
-        logger.info("Code execution completed with result %s", result)
+        logger.info(
+            "Code execution completed with exit code %s (%d bytes stdout, %d bytes stderr, %d files)",
+            result.exit_code,
+            len(result.stdout),
+            len(result.stderr),
+            len(result.files),
+        )
         return code_interpreter_pb2.ExecuteResponse(
             stdout=result.stdout,
             stderr=result.stderr,
@@ -14,23 +14,35 @@
 
 import asyncio
 import base64
-from collections import defaultdict
+import functools
+import hashlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
 from ipaddress import ip_network, ip_address
 import re
-import json
 import logging
+import stat
+import msgspec
+import orjson
 import time
-import uuid
 from contextvars import ContextVar
-from typing import List, Dict
+from typing import Annotated, Any, Callable, List, Dict
 
 from code_interpreter.config import Config
-from code_interpreter.utils.validation import AbsolutePath, Hash
-from fastapi import FastAPI, HTTPException, Depends, status, Request, BackgroundTasks, UploadFile, File, Form
-from json_repair import repair_json
-import fastjsonschema, pathlib, os, json
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel
+from code_interpreter.utils.validation import (
+    ABSOLUTE_PATH_PATTERN,
+    FILENAME_PATTERN,
+    HASH_PATTERN,
+    AbsolutePath,
+    Filename,
+    Hash,
+)
+from fastapi import FastAPI, HTTPException, Depends, status, Request, UploadFile, File, Form
+import os
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse as FileStreamResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from starlette.status import HTTP_403_FORBIDDEN, HTTP_410_GONE
 import mimetypes, re
 
@@ -41,7 +53,7 @@ from code_interpreter.services.custom_tool_executor import (
 )
 from code_interpreter.services.kubernetes_code_executor import KubernetesCodeExecutor
 
-from code_interpreter.utils.file_meta import check_and_decrement, cleanup_expired_files, register, get_file_info
+from code_interpreter.utils.file_meta import check_and_decrement, cleanup_expired_files, expire, register, register_many, get_file_info
 
 from kubernetes.utils.quantity import parse_quantity
 from code_interpreter.utils.validation import parse_duration
@@ -49,10 +61,6 @@ from code_interpreter.utils.validation import parse_duration
 logger = logging.getLogger("code_interpreter_service")
 
 config = Config()
-SCHEMA_PATH = os.getenv("BEE_SCHEMA_PATH")
-_validate = fastjsonschema.compile(
-    json.loads(pathlib.Path(SCHEMA_PATH).read_text())
-) if SCHEMA_PATH else None
 
 ALIASES = {
     "sourceCode": "source_code",
@@ -60,22 +68,26 @@ ALIASES = {
     "timeoutSeconds": "timeout",
     "limitDownloads": "limit",
 }
-_CAMEL_RE = re.compile(r"(?<!^)(?=[A-Z])")
+# decoded-request cache bounds: only small bodies are cached, and the bodies behind the
+# cached entries never add up to more than DECODED_REQUEST_CACHE_BYTES
+DECODED_REQUEST_CACHE_SIZE = 512
+DECODED_REQUEST_CACHE_MAX_BODY = 64 * 1024
+DECODED_REQUEST_CACHE_BYTES = 8 * 1024 * 1024
+
+_FILENAME_RE = re.compile(FILENAME_PATTERN)
 
+# chunk size for file copies
+IO_CHUNK = 256 * 1024
+# downloads are sequential reads of finished files, so larger sends cost nothing extra
+DOWNLOAD_CHUNK = 1024 * 1024
+
+@functools.lru_cache(maxsize=1024)
 def camel_to_snake(name: str) -> str:
-    return _CAMEL_RE.sub("_", name).lower()
-
-def canonicalise(obj):
-    """Recursively normalise dict keys to snake_case and apply ALIASES."""
-    if isinstance(obj, dict):
-        out = {}
-        for k, v in obj.items():
-            k2 = ALIASES.get(k, camel_to_snake(k))
-            out[k2] = canonicalise(v)
-        return out
-    if isinstance(obj, list):
-        return [canonicalise(i) for i in obj]
-    return obj
+    """Single-pass `sourceCode` -> `source_code`, matching the previous `(?<!^)(?=[A-Z])` regex."""
+    return "".join(
+        "_" + c.lower() if i and "A" <= c <= "Z" else c.lower()
+        for i, c in enumerate(name)
+    )
 
 class FileMetadata(BaseModel):
     remaining_downloads: int | None = None
@@ -93,6 +105,56 @@ class ExecuteRequest(BaseModel):
     persistent_workspace: bool = False
 
 
+def _msgspec_pattern(pattern: str) -> str:
+    """
+    msgspec matches patterns with `re.search`, where `$` also matches before a trailing newline;
+    pin the pattern to the whole string so it accepts exactly what pydantic-core does.
+    """
+    return rf"\A(?:{pattern.removeprefix('^').removesuffix('$')})\Z"
+
+
+class ExecuteRequestMsg(msgspec.Struct, forbid_unknown_fields=True):
+    """
+    msgspec mirror of ExecuteRequest, used to decode canonical JSON bodies in one pass.
+    Bodies using aliases, camelCase or a `requestBody` wrapper fail to decode and take the slow path.
+    """
+    source_code: str
+    files: dict[
+        Annotated[str, msgspec.Meta(pattern=_msgspec_pattern(ABSOLUTE_PATH_PATTERN))],
+        Annotated[str, msgspec.Meta(pattern=_msgspec_pattern(HASH_PATTERN))],
+    ] = {}
+    env: dict[str, str] = {}
+    chat_id: str = "default"
+    max_downloads: int | None = None
+    expires_in: str | None = None
+    persistent_workspace: bool = False
+
+_EXECUTE_REQUEST_DECODER = msgspec.json.Decoder(ExecuteRequestMsg)
+
+
+# every ExecuteRequest field, in snake_case and camelCase, so known keys never hit the regex
+FIELD_MAP = {
+    spelling: name
+    for name in ExecuteRequest.model_fields
+    for spelling in (name, re.sub(r"_([a-z])", lambda m: m.group(1).upper(), name))
+} | ALIASES
+
+# payloads using only these keys are already canonical and are passed through as-is
+_CANONICAL_KEYS = frozenset(ExecuteRequest.model_fields)
+
+def _normalize_top_level(payload):
+    """
+    Normalise top-level DTO keys to snake_case and apply ALIASES.
+    Nested values (`files`, `env`) are user data and are left untouched.
+    """
+    if not isinstance(payload, dict) or _CANONICAL_KEYS.issuperset(payload):
+        return payload
+    return {
+        FIELD_MAP.get(k) or (k if k.islower() else camel_to_snake(k)): v
+        for k, v in payload.items()
+    }
+
+
 class ExecuteResponse(BaseModel):
     stdout: str
     stderr: str
@@ -129,9 +191,10 @@ class ExecuteCustomToolErrorResponse(BaseModel):
     stderr: str
 
 class FileRequest(BaseModel):
-    chat_id: str
-    file_hash: str
-    filename: str
+    # validated by pydantic-core before the handler runs; rejects path separators and traversal
+    chat_id: Hash
+    file_hash: Hash
+    filename: Filename
 
 class FileResponse(BaseModel):
     filename: str
@@ -152,83 +215,215 @@ class ExpireRequest(BaseModel):
 class ExpireResponse(BaseModel):
     success: bool
 
+class _SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip responses, except for paths that stream (NDJSON output, file downloads)."""
+
+    def __init__(self, app, excluded_paths: set[str], **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+mimetypes.init()
+
+@functools.lru_cache(maxsize=2048)
+def _guess_content_type(extension: str) -> str:
+    """`extension` is everything from the first dot, so compound suffixes like `.tar.gz` resolve."""
+    return mimetypes.guess_type("file" + extension)[0] or "application/octet-stream"
+
+def _copy_limited(src, dst, max_bytes: int, size: int | None = None) -> int:
+    """
+    Blocking copy of `src` into `dst`, aborting with 413 once more than `max_bytes` were read.
+    A known `size` rejects oversized uploads up front and sizes the buffer for small ones.
+    """
+    if size is not None and size > max_bytes:
+        raise HTTPException(413, "File too large")
+    # a single reused buffer: `dst.write` copies synchronously, so no per-chunk allocation is needed
+    buffer = bytearray(IO_CHUNK if not size else min(size, IO_CHUNK))
+    view = memoryview(buffer)
+    bytes_seen = 0
+    while n := src.readinto(buffer):
+        bytes_seen += n
+        if bytes_seen > max_bytes:
+            raise HTTPException(413, "File too large")
+        dst.write(view[:n])
+    return bytes_seen
+
+def _load_payload(body: bytes, content_type: str):
+    """
+    Parse a JSON request body. Bodies not declared as `application/json` (e.g. raw LLM output)
+    are repaired if they fail to parse.
+    """
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        if content_type.startswith("application/json"):
+            raise HTTPException(400, "Invalid JSON body")
+
+    # json_repair is heavy to import and only needed for malformed bodies
+    from json_repair import repair_json
+
+    # return_objects hands back the repaired value instead of JSON text to parse again;
+    # an unrepairable body comes back as "" (a real "" would have parsed above)
+    payload = repair_json(body.decode(errors="replace"), return_objects=True)
+    if payload == "":
+        raise HTTPException(400, "Invalid JSON body")
+    return payload
+
+_REQUEST_IDS: deque[str] = deque()
+
+def _next_request_id() -> str:
+    """Hand out 32-hex-digit request IDs sliced from one `os.urandom(...).hex()` per 1024 requests."""
+    if not _REQUEST_IDS:
+        digits = os.urandom(16 * 1024).hex()
+        _REQUEST_IDS.extend(digits[i : i + 32] for i in range(0, len(digits), 32))
+    return _REQUEST_IDS.popleft()
+
+class _PrefixSet:
+    """
+    Membership test for a set of CIDRs in O(distinct prefix lengths) rather than O(networks):
+    network addresses are bucketed by prefix length, so a lookup is one shift + set probe per length.
+    """
+
+    def __init__(self, cidrs: list[str]) -> None:
+        self._buckets: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+        for cidr in cidrs:
+            try:
+                network = ip_network(cidr, strict=False)
+            except ValueError:
+                logger.warning("Ignoring invalid internal_ip_allowlist entry %r", cidr)
+                continue
+            shift = network.max_prefixlen - network.prefixlen
+            self._buckets[network.version].setdefault(shift, set()).add(
+                int(network.network_address) >> shift
+            )
+
+    def __contains__(self, ip) -> bool:
+        ip_int = int(ip)
+        return any(
+            ip_int >> shift in prefixes
+            for shift, prefixes in self._buckets[ip.version].items()
+        )
+
+_INTERNAL_NETWORKS = _PrefixSet(config.internal_ip_allowlist)
+_INTERNAL_HOSTS = frozenset(config.internal_host_allowlist)
+
+@functools.lru_cache(maxsize=4096)
+def _is_internal_origin(host: str, client_host: str) -> bool:
+    if host in _INTERNAL_HOSTS:
+        return True
+    try:
+        ip = ip_address(client_host)
+    except ValueError:
+        return False
+    # loopback is not implied: list 127.0.0.0/8 or ::1/128 in internal_ip_allowlist to trust it
+    return ip in _INTERNAL_NETWORKS
+
 def _is_internal_request(req: Request) -> bool:
-    host_ok = req.headers.get("host", "") in config.internal_ip_allowlist
-    ip_ok = any(
-        ip_address(req.client.host) in ip_network(cidr) or "127.0.0.1"
-        for cidr in config.internal_ip_allowlist
+    return _is_internal_origin(
+        req.headers.get("host", ""), req.client.host if req.client else ""
     )
-    return host_ok or ip_ok
 
 
-def _guard_spawn(req: Request):
-    if config.public_spawn_enabled:
-        return
+def _require_internal_request(req: Request) -> None:
     if not _is_internal_request(req):
         raise HTTPException(
             HTTP_403_FORBIDDEN,
             detail="Spawn requests must originate from an internal URL / IP",
         )
 
+def _allow_any_request() -> None:
+    pass
+
 def create_http_server(
     code_executor: KubernetesCodeExecutor,
     custom_tool_executor: CustomToolExecutor,
     request_id_context_var: ContextVar[str],
+    schema_validator: Callable[[Any], Any] | None = None,
 ):
     # vars
-    app = FastAPI()
-
     async def periodic_cleanup():
         while True:
             try:
                 logger.info("Running scheduled file cleanup task")
-                cleanup_expired_files()
+                # sqlite work stays off the event loop so requests are not stalled meanwhile
+                await asyncio.to_thread(cleanup_expired_files)
                 logger.info("Scheduled file cleanup completed")
             except Exception as e:
                 logger.error(f"Error in periodic cleanup: {str(e)}")
             
             await asyncio.sleep(3 * 60 * 60) 
-        
-    asyncio.create_task(periodic_cleanup())
-    logger.info("Scheduled file cleanup task to run every 3 hours")
-    
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # keep a reference so the task is not garbage-collected while sleeping
+        cleanup_task = asyncio.create_task(periodic_cleanup())
+        logger.info("Scheduled file cleanup task to run every 3 hours")
+        try:
+            yield
+        finally:
+            cleanup_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await cleanup_task
+
+    app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+    app.add_middleware(
+        _SelectiveGZipMiddleware,
+        excluded_paths={"/v1/execute-stream", "/v1/download"},
+        minimum_size=1024,
+        compresslevel=5,
+    )
+
+    # convert K8s quantity ("1Gi") → int bytes using k8s-client helper, once per app
+    try:
+        max_upload_bytes = int(parse_quantity(config.file_size_limit))
+    except Exception as e:
+        logger.error("Bad file_size_limit %s - %s",
+                     config.file_size_limit, e, exc_info=True)
+        max_upload_bytes = 1_073_741_824
+    try:
+        max_execute_body_bytes = int(parse_quantity(config.execute_body_size_limit))
+    except Exception as e:
+        logger.error("Bad execute_body_size_limit %s - %s",
+                     config.execute_body_size_limit, e, exc_info=True)
+        max_execute_body_bytes = 10_485_760
+
+    storage_root = os.path.realpath(config.file_storage_path)
+
+    # public_spawn_enabled is fixed for the process, so pick the guard once
+    guard_spawn = Depends(
+        _allow_any_request if config.public_spawn_enabled else _require_internal_request
+    )
+
     def set_request_id():
-        request_id = str(uuid.uuid4())
+        request_id = _next_request_id()
         request_id_context_var.set(request_id)
         return request_id
 
-    @app.post("/v1/upload", response_model=UploadResponse)
+    @app.post("/v1/upload", response_model=UploadResponse, dependencies=[guard_spawn])
     async def upload_file(
         raw_request: Request,
-        chat_id: str = Form(..., pattern=r"^[0-9a-zA-Z_-]{1,255}$"),
+        chat_id: str = Form(..., pattern=HASH_PATTERN),
         upload: UploadFile = File(...),
         max_downloads: int = Form(None),
         expires_in: str | None = Form(None),
         request_id: str = Depends(set_request_id),
     ):
-        _guard_spawn(raw_request)
-
-        if not re.match(r"^[0-9A-Za-z._-]{1,255}$", upload.filename):
+        if not _FILENAME_RE.fullmatch(upload.filename):
             raise HTTPException(400, "Invalid filename")
 
-        # convert K8s quantity ("1Gi") → int bytes using k8s-client helper
-        try:
-            max_bytes = int(parse_quantity(config.file_size_limit))
-        except Exception as e:
-            logger.error("Bad file_size_limit %s - %s",
-                         config.file_size_limit, e, exc_info=True)
-            max_bytes = 1_073_741_824
-
         try:  
-            bytes_seen = 0
             async with code_executor.file_storage.writer(
                 filename=upload.filename, chat_id=chat_id
             ) as dest:
-                while chunk := await upload.read(8192):
-                    bytes_seen += len(chunk)
-                    if bytes_seen > max_bytes:
-                        raise HTTPException(413, "File too large")
-                    await dest.write(chunk)
+                # one worker-thread hop for the whole copy instead of two per chunk
+                bytes_seen = await asyncio.to_thread(
+                    _copy_limited, upload.file, dest.wrapped, max_upload_bytes, upload.size
+                )
 
             register(
                 file_hash=dest.hash,
@@ -273,7 +468,6 @@ def create_http_server(
         request_id: str = Depends(set_request_id),
     ):
         try:
-            from code_interpreter.utils.file_meta import expire
             expire(
                 file_hash=request.file_hash,
                 chat_id=request.chat_id,
@@ -295,19 +489,8 @@ def create_http_server(
     async def download(
         raw_request: Request,
         request: FileRequest,
-        background_tasks: BackgroundTasks,
         request_id: str = Depends(set_request_id),
     ):
-        # Validate input parameters to prevent path traversal
-        if not request.file_hash or not re.match(r'^[0-9a-zA-Z_-]{1,255}$', request.file_hash):
-            raise HTTPException(400, "Invalid file hash format")
-        
-        if not request.chat_id or not re.match(r'^[0-9a-zA-Z_-]{1,255}$', request.chat_id):
-            raise HTTPException(400, "Invalid chat ID format")
-        
-        if not request.filename or not re.match(r'^[0-9a-zA-Z._-]{1,255}$', request.filename):
-            raise HTTPException(400, "Invalid filename format")
-        
         # Check download permissions
         try:
             check_and_decrement(
@@ -326,67 +509,163 @@ def create_http_server(
             logger.error(f"Error checking file permissions: {str(e)}")
             raise HTTPException(404, f"File not found")
 
-        # Build correct file path with new structure
-        filepath = os.path.join(
-            config.file_storage_path, 
-            request.chat_id,
-            request.file_hash, 
-            request.filename
-        )
-        
-        # Check if file exists
-        if not os.path.exists(filepath):
+        # Resolve the path and require it to sit directly in the object's directory,
+        # so names like ".." or symlinks cannot escape it whatever the regexes allow
+        object_dir = os.path.join(storage_root, request.chat_id, request.file_hash)
+        filepath = os.path.realpath(os.path.join(object_dir, request.filename))
+        if os.path.dirname(filepath) != object_dir:
+            logger.warning(f"Rejected path outside storage: {request.chat_id}/{request.file_hash}/{request.filename}")
+            raise HTTPException(404, "File not found")
+
+        # One stat both checks existence and is handed to the response for its headers
+        try:
+            stat_result = os.stat(filepath)
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
             logger.warning(f"File found in DB but not on disk: {request.chat_id}/{request.file_hash}/{request.filename}")
-            raise HTTPException(404, f"File not found on disk")
+            raise HTTPException(404, "File not found on disk")
         
         try:
             # Detect the file type
-            content_type = mimetypes.guess_type(request.filename)[0] or "application/octet-stream"
-            file_size = os.path.getsize(filepath)
-            
-            # Stream file in chunks
-            def file_streamer():
-                with open(filepath, "rb") as file:
-                    while chunk := file.read(8192):
-                        yield chunk
+            dot = request.filename.find(".")
+            content_type = _guess_content_type(
+                request.filename[dot:].lower() if dot != -1 else ""
+            )
             
             logger.info(f"Serving file {request.filename} ({request.file_hash}) to chat {request.chat_id}")
             
-            # Return streaming response
-            return StreamingResponse(
-                file_streamer(),
+            # Starlette serves the file itself (zero-copy via pathsend where the server supports it)
+            response = FileStreamResponse(
+                filepath,
                 media_type=content_type,
-                headers={
-                    "Content-Disposition": f"attachment; filename={request.filename}",
-                    "Content-Length": str(file_size),
-                }
+                filename=request.filename,
+                stat_result=stat_result,
             )
+            # Starlette's default is 64 KiB per read/send
+            response.chunk_size = DOWNLOAD_CHUNK
+            return response
         except Exception as e:
             logger.error(f"Error reading file: {str(e)}")
             raise HTTPException(500, f"Error reading file: {str(e)}")
 
 
-    @app.post("/v1/execute", response_model=ExecuteResponse)
-    async def execute(
-        raw_request: Request,
-        request_id: str = Depends(set_request_id),
-    ):
-        _guard_spawn(raw_request)
-
-        payload = json.loads(await raw_request.body())
-        if isinstance(payload, dict) and set(payload) == {"requestBody"}:
+    def decode_execute_request(body: bytes, content_type: str) -> ExecuteRequest:
+        if not schema_validator and content_type.startswith("application/json"):
+            try:
+                message = _EXECUTE_REQUEST_DECODER.decode(body)
+            except msgspec.DecodeError:
+                pass
+            else:
+                return ExecuteRequest.model_construct(**msgspec.structs.asdict(message))
+
+        payload = _load_payload(body, content_type)
+        if isinstance(payload, dict) and len(payload) == 1 and "requestBody" in payload:
             payload = payload["requestBody"]
 
-        payload = canonicalise(payload)
-        if _validate:
-            _validate(payload)
-
-        request = ExecuteRequest.model_validate(payload)
+        payload = _normalize_top_level(payload)
+        if schema_validator:
+            try:
+                schema_validator(payload)
+            except ValueError as e:
+                # fastjsonschema's JsonSchemaException is a ValueError; report it as a client error
+                raise HTTPException(422, f"Request does not match schema: {e}")
+        # the deployment schema may not constrain every field, so the model always validates
+        try:
+            return ExecuteRequest.model_validate(payload)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+    # decoded requests keyed by a digest of content type + body, so retried payloads skip decoding;
+    # each entry holds the decoded ExecuteRequest and the size of the body it came from
+    decoded_requests: OrderedDict[bytes, tuple[ExecuteRequest, int]] = OrderedDict()
+    decoded_requests_bytes = 0
+
+    def decode_execute_request_cached(body: bytes, content_type: str) -> ExecuteRequest:
+        nonlocal decoded_requests_bytes
+        if len(body) > DECODED_REQUEST_CACHE_MAX_BODY:
+            return decode_execute_request(body, content_type)
+
+        digest = hashlib.blake2b(body, digest_size=16)
+        digest.update(content_type.encode())
+        key = digest.digest()
+
+        if (entry := decoded_requests.get(key)) is not None:
+            decoded_requests.move_to_end(key)
+            return entry[0]
+
+        request = decode_execute_request(body, content_type)
+        decoded_requests[key] = (request, len(body))
+        decoded_requests_bytes += len(body)
+        while (
+            len(decoded_requests) > DECODED_REQUEST_CACHE_SIZE
+            or decoded_requests_bytes > DECODED_REQUEST_CACHE_BYTES
+        ):
+            _, (_, size) = decoded_requests.popitem(last=False)
+            decoded_requests_bytes -= size
+        return request
+
+    async def read_execute_body(raw_request: Request) -> bytes:
+        """Read the body, rejecting oversized ones before they are buffered or parsed."""
+        declared = raw_request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > max_execute_body_bytes:
+            raise HTTPException(413, "Request body too large")
+
+        # chunked bodies carry no length, so the limit is also enforced while reading
+        chunks = []
+        size = 0
+        async for chunk in raw_request.stream():
+            size += len(chunk)
+            if size > max_execute_body_bytes:
+                raise HTTPException(413, "Request body too large")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def parse_execute_request(raw_request: Request) -> ExecuteRequest:
+        request = decode_execute_request_cached(
+            await read_execute_body(raw_request), raw_request.headers.get("content-type", "")
+        )
 
         if config.require_chat_id and not request.chat_id:
             raise HTTPException(403, "Chat ID required but missing")
 
+        return request
+
+    def register_workspace_files(
+        request: ExecuteRequest, files: Dict[AbsolutePath, Hash]
+    ) -> Dict[AbsolutePath, FileMetadata]:
+        files_metadata: Dict[AbsolutePath, FileMetadata] = {}
+
+        if request.persistent_workspace and files:
+            names = {abs_path: os.path.basename(abs_path) for abs_path in files}
+            infos = register_many(
+                ((file_hash, names[abs_path]) for abs_path, file_hash in files.items()),
+                chat_id=request.chat_id,
+                max_downloads=request.max_downloads,
+                expires_in=request.expires_in,
+            )
+            for abs_path, file_hash in files.items():
+                info = infos[(file_hash, names[abs_path])]
+                files_metadata[abs_path] = FileMetadata(
+                    remaining_downloads=info["remaining_downloads"],
+                    expires_at=info["expires_at"],
+                )
+
+        return files_metadata
+
+    @app.post("/v1/execute", response_model=ExecuteResponse, dependencies=[guard_spawn])
+    async def execute(
+        raw_request: Request,
+        request_id: str = Depends(set_request_id),
+    ):
+        request = await parse_execute_request(raw_request)
+
         try:
+            logger.info(
+                "Executing code (%d bytes, %d files)",
+                len(request.source_code),
+                len(request.files),
+            )
             result = await code_executor.execute(
                 source_code=request.source_code,
                 files=request.files,
@@ -394,26 +673,15 @@ def create_http_server(
                 chat_id=request.chat_id,
                 persistent_workspace=request.persistent_workspace,
             )
+            logger.info(
+                "Code execution completed with exit code %s (%d bytes stdout, %d bytes stderr, %d files)",
+                result.exit_code,
+                len(result.stdout),
+                len(result.stderr),
+                len(result.files),
+            )
 
-            files_metadata: Dict[AbsolutePath, FileMetadata] = {}
-
-            if request.persistent_workspace and result.files:
-                for abs_path, file_hash in result.files.items():
-                    filename = os.path.basename(abs_path)
-
-                    register(
-                        file_hash=file_hash,
-                        chat_id=request.chat_id,
-                        filename=filename,
-                        max_downloads=request.max_downloads,
-                        expires_in=request.expires_in,
-                    )
-
-                    info = get_file_info(file_hash, request.chat_id, filename)
-                    files_metadata[abs_path] = FileMetadata(
-                        remaining_downloads=info["remaining_downloads"],
-                        expires_at=info["expires_at"],
-                    )
+            files_metadata = register_workspace_files(request, result.files)
 
             return ExecuteResponse(
                 stdout=result.stdout,
@@ -423,41 +691,61 @@ def create_http_server(
                 files_metadata=files_metadata,
                 chat_id=result.chat_id,
             )
-        
-            logger.info("Code execution completed with result %s", result)
-            return response
 
         except Exception as e:
             logger.exception("Execution failure: %s", e)
             raise HTTPException(500, str(e))
 
+    @app.post("/v1/execute-stream", dependencies=[guard_spawn])
+    async def execute_stream(
+        raw_request: Request,
+        request_id: str = Depends(set_request_id),
+    ):
+        """
+        Same request body as /v1/execute; the response is NDJSON with one
+        `{"type": "stdout" | "stderr", "data": ...}` frame per line of output,
+        ending with an `exit` frame (or an `error` frame on failure).
+        """
+        request = await parse_execute_request(raw_request)
+
+        async def ndjson_frames():
+            try:
+                async for frame in code_executor.execute_iter(
+                    source_code=request.source_code,
+                    files=request.files,
+                    env=request.env,
+                    chat_id=request.chat_id,
+                    persistent_workspace=request.persistent_workspace,
+                ):
+                    if frame["type"] == "exit":
+                        frame["files_metadata"] = {
+                            path: metadata.model_dump()
+                            for path, metadata in register_workspace_files(
+                                request, frame["files"]
+                            ).items()
+                        }
+                    yield orjson.dumps(frame) + b"\n"
+            except Exception as e:
+                logger.exception("Execution failure: %s", e)
+                yield orjson.dumps({"type": "error", "data": str(e)}) + b"\n"
+
+        return StreamingResponse(ndjson_frames(), media_type="application/x-ndjson")
+
     @app.post(
         "/v1/parse-custom-tool",
         response_model=ParseCustomToolResponse,
+        dependencies=[guard_spawn],
     )
     async def parse_custom_tool(
-        raw_request: Request, request: ParseCustomToolRequest, request_id: str = Depends(set_request_id)
+        raw_request: Request, request_id: str = Depends(set_request_id)
     ):
-        _guard_spawn(raw_request)
-
+        # disabled; no body parameter so FastAPI does not parse one
         raise HTTPException(401, "Method disabled")
 
-        logger.info("Parsing custom tool with source code %s", request.tool_source_code)
-        custom_tool = custom_tool_executor.parse(
-            tool_source_code=request.tool_source_code
-        )
-        result = ParseCustomToolResponse(
-            tool_name=custom_tool.name,
-            tool_input_schema_json=json.dumps(custom_tool.input_schema),
-            tool_description=custom_tool.description,
-        )
-        logger.info("Parsed custom tool %s", result)
-        return result
-
     @app.exception_handler(CustomToolParseError)
     async def validation_exception_handler(request, e):
         logger.warning("Invalid custom tool: %s", e.errors)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content=ParseCustomToolErrorResponse(error_messages=e.errors).model_dump(),
         )
@@ -465,33 +753,25 @@ def create_http_server(
     @app.post(
         "/v1/execute-custom-tool",
         response_model=ExecuteCustomToolResponse,
+        dependencies=[guard_spawn],
     )
     async def execute_custom_tool(
         raw_request: Request,
-        request: ExecuteCustomToolRequest,
         request_id: str = Depends(set_request_id),
     ):
-        _guard_spawn(raw_request)
-
+        # disabled; no body parameter so FastAPI does not parse one
         raise HTTPException(401, "Method disabled")
 
-        logger.info(
-            "Executing custom tool with source code %s", request.tool_source_code
-        )
-        result = await custom_tool_executor.execute(
-            tool_input_json=request.tool_input_json,
-            tool_source_code=request.tool_source_code,
-            env=request.env,
-        )
-        logger.info("Executed custom tool with result %s", result)
-        return ExecuteCustomToolResponse(tool_output_json=json.dumps(result))
-
     @app.exception_handler(CustomToolExecuteError)
     async def validation_exception_handler(request, e):
         logger.warning("Error executing custom tool: %s", e)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content=ExecuteCustomToolErrorResponse(stderr=str(e)).model_dump(),
         )
 
+    # build the OpenAPI schema now rather than on the event loop at the first /docs hit
+    # (app.openapi() stores the result on app.openapi_schema itself)
+    app.openapi()
+
     return app
@@ -23,6 +23,7 @@ from dataclasses import dataclass
 from typing import AsyncGenerator, Mapping
 
 import httpx
+import orjson
 from pydantic import validate_call
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
@@ -35,6 +36,8 @@ logger = logging.getLogger("kubernetes_code_executor")
 
 config = Config()
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class KubernetesCodeExecutor:
     @dataclass
@@ -65,6 +68,15 @@ class KubernetesCodeExecutor:
         self.executor_pod_queue_spawning_count = 0
         self.executor_pod_queue = collections.deque()
         self.executor_pod_name_prefix = executor_pod_name_prefix
+        # shared by all executions: building a client (and its SSL context) per call is not free,
+        # and concurrent executions each hold a few connections to their own pod
+        self.http_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        )
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
 
     @retry(
         retry=retry_if_exception_type(RuntimeError),
@@ -83,21 +95,11 @@ class KubernetesCodeExecutor:
         if chat_id is None:
             chat_id = "default"
 
-        async with self.executor_pod() as executor_pod, httpx.AsyncClient(
-            timeout=60.0
-        ) as client:
+        client = self.http_client
+        async with self.executor_pod() as executor_pod:
             executor_pod_ip = executor_pod["status"]["podIP"]
 
-            async def upload_file(path_: str, file_hash: str):
-                async with self.file_storage.reader(
-                    file_hash, chat_id, os.path.basename(path_)
-                ) as fh:
-                    return await client.put(
-                        f"http://{executor_pod_ip}:8000/workspace/{path_.removeprefix('/workspace/')}",
-                        data=fh,
-                    )
-            logger.info("Uploading %s files to executor pod", len(files))
-            await asyncio.gather(*(upload_file(p, h) for p, h in files.items()))
+            await self._upload_files(client, executor_pod_ip, files, chat_id)
 
             logger.info("Requesting code execution")
             response = (
@@ -109,36 +111,9 @@ class KubernetesCodeExecutor:
 
             stored_files: dict[str, str] = {}
             if persistent_workspace and response["files"]:
-                async def download_file(file_path: str):
-                    filename = os.path.basename(file_path)
-                    async with self.file_storage.writer(
-                        filename, chat_id
-                    ) as stored_file, client.stream(
-                        "GET",
-                        f"http://{executor_pod_ip}:8000/workspace/{file_path.removeprefix('/workspace/')}",
-                    ) as pod_file:
-                        pod_file.raise_for_status()
-                        async for chunk in pod_file.aiter_bytes():
-                            await stored_file.write(chunk)
-
-                        from code_interpreter.utils.file_meta import register
-
-                        register(
-                            file_hash=stored_file.hash,
-                            chat_id=chat_id,
-                            filename=filename,
-                            max_downloads=config.global_max_downloads,
-                        )
-
-                        return file_path, stored_file.hash
-
-                logger.info("Collecting %s changed files", len(response["files"]))
-                stored_files = {
-                    p: h
-                    for p, h in await asyncio.gather(
-                        *(download_file(p) for p in response["files"])
-                    )
-                }
+                stored_files = await self._collect_files(
+                    client, executor_pod_ip, response["files"], chat_id
+                )
 
             return KubernetesCodeExecutor.Result(
                 stdout=response["stdout"],
@@ -148,6 +123,118 @@ class KubernetesCodeExecutor:
                 chat_id=chat_id,
             )
 
+    @validate_call
+    async def execute_iter(
+        self,
+        source_code: str,
+        files: Mapping[AbsolutePath, Hash] = {},
+        env: Mapping[str, str] = {},
+        chat_id: str | None = None,
+        persistent_workspace: bool = False,
+    ) -> AsyncGenerator[dict, None]:
+        """
+        Like `execute`, but yields output frames as the code runs:
+        `{"type": "stdout" | "stderr", "data": ...}`, followed by a final
+        `{"type": "exit", "exit_code": ..., "files": {path: hash}, "chat_id": ...}`.
+        """
+        if chat_id is None:
+            chat_id = "default"
+
+        client = self.http_client
+        async with self.executor_pod() as executor_pod:
+            executor_pod_ip = executor_pod["status"]["podIP"]
+            await self._upload_files(client, executor_pod_ip, files, chat_id)
+
+            logger.info("Requesting streamed code execution")
+            async with client.stream(
+                "POST",
+                f"http://{executor_pod_ip}:8000/execute-stream",
+                json={"source_code": source_code, "env": env},
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    frame = orjson.loads(line)
+                    if frame["type"] != "exit":
+                        yield frame
+                        continue
+
+                    stored_files: dict[str, str] = {}
+                    if persistent_workspace and frame["files"]:
+                        stored_files = await self._collect_files(
+                            client, executor_pod_ip, frame["files"], chat_id
+                        )
+                    yield {
+                        "type": "exit",
+                        "exit_code": frame["exit_code"],
+                        "files": stored_files,
+                        "chat_id": chat_id,
+                    }
+
+    async def _upload_files(
+        self,
+        client: httpx.AsyncClient,
+        executor_pod_ip: str,
+        files: Mapping[AbsolutePath, Hash],
+        chat_id: str,
+    ) -> None:
+        async def upload_file(path_: str, file_hash: str):
+            async with self.file_storage.reader(
+                file_hash, chat_id, os.path.basename(path_)
+            ) as fh:
+                # iterating the file itself would yield newline-delimited pieces
+                async def chunks():
+                    while chunk := await fh.read(UPLOAD_CHUNK_SIZE):
+                        yield chunk
+
+                return await client.put(
+                    f"http://{executor_pod_ip}:8000/workspace/{path_.removeprefix('/workspace/')}",
+                    content=chunks(),
+                    # known length keeps the request out of chunked transfer encoding
+                    headers={"Content-Length": str(os.fstat(fh.wrapped.fileno()).st_size)},
+                )
+        logger.info("Uploading %s files to executor pod", len(files))
+        await asyncio.gather(*(upload_file(p, h) for p, h in files.items()))
+
+    async def _collect_files(
+        self,
+        client: httpx.AsyncClient,
+        executor_pod_ip: str,
+        file_paths: list[str],
+        chat_id: str,
+    ) -> dict[str, str]:
+        async def download_file(file_path: str):
+            filename = os.path.basename(file_path)
+            async with self.file_storage.writer(
+                filename, chat_id
+            ) as stored_file, client.stream(
+                "GET",
+                f"http://{executor_pod_ip}:8000/workspace/{file_path.removeprefix('/workspace/')}",
+            ) as pod_file:
+                pod_file.raise_for_status()
+                async for chunk in pod_file.aiter_bytes():
+                    await stored_file.write(chunk)
+
+                from code_interpreter.utils.file_meta import register
+
+                register(
+                    file_hash=stored_file.hash,
+                    chat_id=chat_id,
+                    filename=filename,
+                    max_downloads=config.global_max_downloads,
+                )
+
+                return file_path, stored_file.hash
+
+        logger.info("Collecting %s changed files", len(file_paths))
+        return {
+            p: h
+            for p, h in await asyncio.gather(
+                *(download_file(p) for p in file_paths)
+            )
+        }
+
     async def fill_executor_pod_queue(self):
         count_to_spawn = (
             self.executor_pod_queue_target_length
@@ -165,18 +252,36 @@ class KubernetesCodeExecutor:
         )
         self.executor_pod_queue_spawning_count += count_to_spawn
 
-        spawned_pods = 0
-        for pod_task in asyncio.as_completed(
-            asyncio.create_task(self.spawn_executor_pod())
-            for _ in range(count_to_spawn)
-        ):
+        try:
+            names = await self._create_executor_pods(count_to_spawn)
+        except Exception:
+            logger.exception("Failed to create %s executor pods", count_to_spawn)
+            self.executor_pod_queue_spawning_count -= count_to_spawn
+            return
+
+        async def wait_into_queue(name: str):
+            # each pod joins the queue as soon as it is ready, not when the whole batch is
             try:
-                self.executor_pod_queue.append(await pod_task)
-                spawned_pods += 1
-            except Exception:
-                logger.exception("Failed to spawn executor pod")
+                try:
+                    pod = await self._wait_for_executor_pod(name)
+                except RuntimeError:
+                    # the failed pod is already deleted; replace it under spawn_executor_pod's retry policy
+                    logger.warning("Executor pod %s did not become ready, spawning a replacement", name)
+                    pod = await self.spawn_executor_pod()
+                self.executor_pod_queue.append(pod)
             finally:
                 self.executor_pod_queue_spawning_count -= 1
+
+        results = await asyncio.gather(
+            *(wait_into_queue(name) for name in names),
+            return_exceptions=True,
+        )
+        spawned_pods = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Failed to spawn executor pod", exc_info=result)
+            else:
+                spawned_pods += 1
         logger.info(
             "Executor pod queue extended, spawned: %s, failed to spawn: %s, current queue length: %s, still spawning: %s",
             spawned_pods,
@@ -185,72 +290,114 @@ class KubernetesCodeExecutor:
             self.executor_pod_queue_spawning_count,
         )
 
-    @retry(
-        retry=retry_if_exception_type(RuntimeError),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-    )
-    async def spawn_executor_pod(self):
+    async def _ensure_self_pod(self) -> None:
         # cache the controller-pod meta once
         if self.self_pod is None:
             self.self_pod = await self.kubectl.get("pod", os.environ["HOSTNAME"])
 
+    def _new_executor_pod_name(self) -> str:
         # unique pod name: code-executor-xxxxxx
-        name = self.executor_pod_name_prefix + "".join(
+        return self.executor_pod_name_prefix + "".join(
             random.choice(string.ascii_lowercase + string.digits) for _ in range(6)
         )
 
+    def _executor_pod_manifest(self, name: str) -> dict:
+        return {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {
+                "name": name,
+                "ownerReferences": [
+                    {   # tie lifetime to this controller pod
+                        "apiVersion": "v1",
+                        "kind": "Pod",
+                        "name": self.self_pod["metadata"]["name"],
+                        "uid":  self.self_pod["metadata"]["uid"],
+                        "controller": True,
+                        "blockOwnerDeletion": False,
+                    }
+                ],
+            },
+            "spec": {
+                "volumes": [
+                    {
+                        "name": "workspace",
+                        "emptyDir": {
+                            "medium": "Memory",
+                            "sizeLimit": config.file_size_limit,
+                        },
+                    }
+                ],
+                "containers": [
+                    {
+                        "name":  "executor",
+                        "image": self.executor_image,
+                        "resources": self.container_resources,
+                        "ports": [{"containerPort": 8000}],
+                        "volumeMounts": [
+                            {"name": "workspace", "mountPath": "/workspace"}
+                        ],
+                    }
+                ],
+                # allow extra spec tweaks from config
+                **self.executor_pod_spec_extra,
+            },
+        }
+
+    async def _wait_for_executor_pod(self, name: str) -> dict:
+        try:
+            # wait until Ready (≤60 s)
+            return await self.kubectl.wait(
+                "pod", name, _for="condition=Ready", timeout="60s"
+            )
+        except Exception:
+            # best-effort cleanup if the pod never becomes ready
+            try:
+                await self.kubectl.delete("pod", name)
+            finally:
+                raise RuntimeError("Failed to spawn the pod")
+
+    @retry(
+        retry=retry_if_exception_type(RuntimeError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+    )
+    async def _create_executor_pods(self, count: int) -> list[str]:
+        await self._ensure_self_pod()
+        names = [self._new_executor_pod_name() for _ in range(count)]
+
+        # one create call (a `List` of pods) for the whole batch instead of one apiserver round-trip per pod
         try:
             await self.kubectl.create(
                 filename="-",
                 input={
                     "apiVersion": "v1",
-                    "kind": "Pod",
-                    "metadata": {
-                        "name": name,
-                        "ownerReferences": [
-                            {   # tie lifetime to this controller pod
-                                "apiVersion": "v1",
-                                "kind": "Pod",
-                                "name": self.self_pod["metadata"]["name"],
-                                "uid":  self.self_pod["metadata"]["uid"],
-                                "controller": True,
-                                "blockOwnerDeletion": False,
-                            }
-                        ],
-                    },
-                    "spec": {
-                        "volumes": [
-                            {
-                                "name": "workspace",
-                                "emptyDir": {
-                                    "medium": "Memory",
-                                    "sizeLimit": config.file_size_limit,
-                                },
-                            }
-                        ],
-                        "containers": [
-                            {
-                                "name":  "executor",
-                                "image": self.executor_image,
-                                "resources": self.container_resources,
-                                "ports": [{"containerPort": 8000}],
-                                "volumeMounts": [
-                                    {"name": "workspace", "mountPath": "/workspace"}
-                                ],
-                            }
-                        ],
-                        # allow extra spec tweaks from config
-                        **self.executor_pod_spec_extra,
-                    },
+                    "kind": "List",
+                    "items": [self._executor_pod_manifest(name) for name in names],
                 },
             )
+        except Exception:
+            # a partially applied List may have left some pods behind
+            try:
+                await self.kubectl.delete("pod", *names, ignore_not_found=True)
+            finally:
+                raise RuntimeError("Failed to spawn the pods")
 
-            # wait until Ready (≤60 s)
-            return await self.kubectl.wait(
-                "pod", name, _for="condition=Ready", timeout="60s"
-            )
+        return names
 
+    @retry(
+        retry=retry_if_exception_type(RuntimeError),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+    )
+    async def spawn_executor_pod(self):
+        await self._ensure_self_pod()
+        name = self._new_executor_pod_name()
+
+        try:
+            await self.kubectl.create(
+                filename="-", input=self._executor_pod_manifest(name)
+            )
         except Exception:
             # best-effort cleanup if creation fails
             try:
@@ -258,6 +405,8 @@ class KubernetesCodeExecutor:
             finally:
                 raise RuntimeError("Failed to spawn the pod")
 
+        return await self._wait_for_executor_pod(name)
+
     @asynccontextmanager
     async def executor_pod(self) -> AsyncGenerator[dict, None]:
         pod = (
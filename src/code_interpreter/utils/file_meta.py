@@ -1,19 +1,19 @@
 from datetime import datetime
 import os
 import sqlite3
+import threading
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 from code_interpreter.config import Config
 from code_interpreter.utils.validation import parse_duration
 
 config = Config()
 os.makedirs(config.file_storage_path, exist_ok=True)
 _DB = Path(config.file_storage_path) / "file_mgmt_db.sqlite3"
-_CONN = sqlite3.connect(_DB, check_same_thread=False, isolation_level=None)
-_CONN.execute("PRAGMA journal_mode=WAL;")
+_LOCAL = threading.local()
 
-_CONN.execute("""
+_SCHEMA = """
     CREATE TABLE IF NOT EXISTS files (
         file_hash      TEXT,
         chat_id        TEXT NOT NULL,
@@ -22,7 +22,26 @@ _CONN.execute("""
         expires_at     TEXT,     -- ISO formatted date or NULL for no expiry
         PRIMARY KEY (file_hash, chat_id, filename)
     );
-""")
+"""
+
+def _conn() -> sqlite3.Connection:
+    """
+    One connection per thread (event loop, cleanup worker, ...), so threads never share
+    a connection or interleave each other's transactions. Each connection keeps
+    sqlite3's per-connection prepared-statement cache warm for the queries below.
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(_DB, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        # WAL makes NORMAL durable across application crashes; only power loss can drop the last commits
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA mmap_size=268435456;")
+        # created on first connection, so importing this module does not open the database
+        conn.execute(_SCHEMA)
+        _LOCAL.conn = conn
+    return conn
 
 logger = logging.getLogger("code_interpreter_service")
 
@@ -44,7 +63,7 @@ def register(
     expires_at = _expiry_timestamp(expires_in)
 
     try:
-        _CONN.execute(
+        _conn().execute(
             """
             INSERT INTO files (file_hash, chat_id, filename, remaining, expires_at)
             VALUES (?,?,?,?,?)
@@ -65,9 +84,80 @@ def register(
     except Exception as exc:
         logger.error("DB register failed: %s", exc, exc_info=True)
 
+def register_many(
+    files: Iterable[tuple[str, str]],
+    chat_id: str,
+    max_downloads: int | None = None,
+    expires_in: str | None = None,
+) -> dict[tuple[str, str], dict]:
+    """Register several (file_hash, filename) pairs in one transaction and return their info"""
+    if not chat_id:
+        raise TypeError("hash/chat_id/filename must be non-empty")
+
+    remaining = None if (max_downloads or 0) == 0 else max_downloads
+    expires_at = _expiry_timestamp(expires_in)
+    rows = [(file_hash, chat_id, filename, remaining, expires_at) for file_hash, filename in files]
+    if any(not file_hash or not filename for file_hash, _, filename, _, _ in rows):
+        raise TypeError("hash/chat_id/filename must be non-empty")
+
+    conn = _conn()
+    conn.execute("BEGIN;")
+    try:
+        conn.executemany(
+            """
+            INSERT INTO files (file_hash, chat_id, filename, remaining, expires_at)
+            VALUES (?,?,?,?,?)
+            ON CONFLICT(file_hash, chat_id, filename) DO UPDATE
+              SET remaining  = excluded.remaining,
+                  expires_at = excluded.expires_at;
+            """,
+            rows,
+        )
+        conn.execute("COMMIT;")
+    except Exception:
+        conn.execute("ROLLBACK;")
+        raise
+
+    logger.info(
+        "Registered %d files for %s - dl=%s exp=%s",
+        len(rows),
+        chat_id,
+        "∞" if remaining is None else remaining,
+        expires_at or "never",
+    )
+    # The upsert wrote exactly these values, so there is nothing to read back
+    return {
+        (file_hash, filename): {
+            "file_hash": file_hash,
+            "chat_id": chat_id,
+            "filename": filename,
+            "remaining_downloads": remaining,
+            "expires_at": expires_at,
+        }
+        for file_hash, _, filename, _, _ in rows
+    }
+
 def check_and_decrement(file_hash: str, chat_id: str, filename: str) -> None:
     """Check if a file can be downloaded and decrement its download counter"""
-    row = _CONN.execute(
+    # one atomic statement for the common case; unlimited rows keep remaining = NULL
+    row = _conn().execute(
+        """
+        UPDATE files SET remaining = remaining - 1
+        WHERE file_hash = ? AND chat_id = ? AND filename = ?
+          AND (remaining IS NULL OR remaining > 0)
+          AND (expires_at IS NULL OR expires_at > ?)
+        RETURNING remaining;
+        """,
+        (file_hash, chat_id, filename, datetime.now().isoformat()),
+    ).fetchone()
+
+    if row is not None:
+        if row[0] is not None:
+            logger.debug(f"Remaining downloads for {filename}: {row[0]}")
+        return
+
+    # refused: look the row up only to tell the caller why
+    row = _conn().execute(
         "SELECT remaining, expires_at FROM files WHERE file_hash = ? AND chat_id = ? AND filename = ?;", 
         (file_hash, chat_id, filename)
     ).fetchone()
@@ -77,35 +167,20 @@ def check_and_decrement(file_hash: str, chat_id: str, filename: str) -> None:
 
     remaining, expires_at = row
 
-    if expires_at is not None:
-        try:
-            expiry_date = datetime.fromisoformat(expires_at)
-            if datetime.now() > expiry_date:
-                # Set remaining to 0 on expiry rather than deleting
-                _CONN.execute(
-                    "UPDATE files SET remaining = 0 WHERE file_hash = ? AND chat_id = ? AND filename = ?;", 
-                    (file_hash, chat_id, filename)
-                )
-                logger.debug(f"File {filename} has expired by date")
-                raise PermissionError(f"File {filename} has expired, aborting download")
-        except ValueError:
-            logger.error(f"Invalid date format in database: {expires_at}")
-
-    # Check for download count expiration
-    if remaining is not None and remaining <= 0:
-        raise PermissionError(f"Download limit reached for file {filename}")
-
-    # Decrement counter if limited
-    if remaining is not None:
-        _CONN.execute(
-            "UPDATE files SET remaining = remaining - 1 WHERE file_hash = ? AND chat_id = ? AND filename = ?;", 
+    if remaining is None or remaining > 0:
+        # Set remaining to 0 on expiry rather than deleting
+        _conn().execute(
+            "UPDATE files SET remaining = 0 WHERE file_hash = ? AND chat_id = ? AND filename = ?;", 
             (file_hash, chat_id, filename)
         )
-        logger.debug(f"Remaining downloads for {filename}: {remaining-1}")
+        logger.debug(f"File {filename} has expired by date")
+        raise PermissionError(f"File {filename} has expired, aborting download")
+
+    raise PermissionError(f"Download limit reached for file {filename}")
 
 def expire(file_hash: str, chat_id: str, filename: str) -> None:
     """Set a file's remaining downloads to 0 to mark it as expired"""
-    cur = _CONN.execute(
+    cur = _conn().execute(
         "UPDATE files SET remaining = 0 "
         "WHERE file_hash = ? AND chat_id = ? AND filename = ?;",
         (file_hash, chat_id, filename),
@@ -117,7 +192,7 @@ def expire(file_hash: str, chat_id: str, filename: str) -> None:
 
 def get_file_info(file_hash: str, chat_id: str, filename: str):
     """Get information about a registered file"""
-    row = _CONN.execute(
+    row = _conn().execute(
         "SELECT remaining, expires_at FROM files WHERE file_hash = ? AND chat_id = ? AND filename = ?;", 
         (file_hash, chat_id, filename)
     ).fetchone()
@@ -138,16 +213,20 @@ def cleanup_expired_files():
     """Find and set files as expired based on downloads or date"""
     try:
         # Mark files as expired based on date
-        _CONN.execute(
+        # expires_at holds local isoformat() text, so compare against the same format;
+        # SQLite's datetime('now') is UTC with a space separator and does not order with it
+        _conn().execute(
             """
             UPDATE files 
             SET remaining = 0 
-            WHERE expires_at IS NOT NULL AND expires_at < datetime('now') AND remaining != 0
-            """
+            WHERE expires_at IS NOT NULL AND expires_at < ?
+              AND (remaining IS NULL OR remaining != 0)
+            """,
+            (datetime.now().isoformat(),),
         )
         
         # Get all expired files (remaining = 0)
-        expired = _CONN.execute(
+        expired = _conn().execute(
             "SELECT file_hash, chat_id, filename FROM files WHERE remaining = 0"
         ).fetchall()
         
@@ -19,10 +19,17 @@ import re
 from datetime import timedelta
 from pydantic import Field
 
-Hash = TypeAliasType("Hash", Annotated[str, Field(pattern=r"^[0-9a-zA-Z_-]{1,255}$")])
+# shared with the msgspec decoder and the HTTP id checks so the patterns cannot drift;
+# pydantic-core compiles each of them once when the model schema is built
+HASH_PATTERN = r"^[0-9a-zA-Z_-]{1,255}$"
+ABSOLUTE_PATH_PATTERN = r"^/[^/].*$"
+FILENAME_PATTERN = r"^[0-9a-zA-Z._-]{1,255}$"
+
+Hash = TypeAliasType("Hash", Annotated[str, Field(pattern=HASH_PATTERN)])
 AbsolutePath = TypeAliasType(
-    "AbsolutePath", Annotated[str, Field(pattern=r"^/[^/].*$")]
+    "AbsolutePath", Annotated[str, Field(pattern=ABSOLUTE_PATH_PATTERN)]
 )
+Filename = TypeAliasType("Filename", Annotated[str, Field(pattern=FILENAME_PATTERN)])
 
 _DURATION_RX = re.compile(r"\s*(?P<num>\d+)\s*(?P<unit>[smhdw])\s*$", re.I)
 _UNIT_KW = {
@@ -168,6 +168,49 @@ def test_download_errors(http_client, setup_test_files):
         assert http_client.post("/v1/download", json=payload).status_code == 404
 
 
+def test_download_rejects_traversal(http_client, setup_test_files):
+    hashes, _ = setup_test_files
+    file_hash = hashes["test_file1.txt"]
+    bad_cases = [
+        dict(chat_id="test_chat_1", file_hash=file_hash, filename="../test_file1.txt"),
+        dict(chat_id="test_chat_1", file_hash=file_hash, filename=".."),
+        dict(chat_id="test_chat_1", file_hash="..", filename="test_file1.txt"),
+        dict(chat_id="..", file_hash=file_hash, filename="test_file1.txt"),
+        dict(chat_id="test_chat_1/..", file_hash=file_hash, filename="test_file1.txt"),
+    ]
+    for payload in bad_cases:
+        r = http_client.post("/v1/download", json=payload)
+        assert 400 <= r.status_code < 500, payload
+        assert "content of" not in r.text
+
+
+def test_download_rejects_symlink_escape(http_client, config, tmp_path):
+    chat_id, filename = "symlink_escape_chat", "link.txt"
+    upload = http_client.post(
+        "/v1/upload",
+        files={
+            "chat_id": (None, chat_id),
+            "upload": (filename, io.BytesIO(b"harmless"), "text/plain"),
+        },
+    )
+    assert upload.status_code == 200
+    file_hash = upload.json()["file_hash"]
+
+    # swap the stored object for a symlink pointing outside the storage root
+    secret = tmp_path / "secret.txt"
+    secret.write_text("top secret")
+    stored = Path(config.file_storage_path) / chat_id / file_hash / filename
+    stored.unlink()
+    stored.symlink_to(secret)
+
+    r = http_client.post(
+        "/v1/download",
+        json=dict(chat_id=chat_id, file_hash=file_hash, filename=filename),
+    )
+    assert r.status_code == 404
+    assert "top secret" not in r.text
+
+
 def test_no_persist(http_client):
     src = "from pathlib import Path; Path('file.txt').write_text('Hello')"
     resp = http_client.post("/v1/execute",
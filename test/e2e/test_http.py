@@ -314,3 +314,105 @@ def test_bad_source_code_key_name(http_client: httpx.Client):
     response_json = response.json()
     assert "Hello World" in response_json["stdout"]
 
+
+
+def _stream_frames(http_client: httpx.Client, source_code: str, timeout: float = 30) -> list[dict]:
+    with http_client.stream(
+        "POST", "/v1/execute-stream", json={"source_code": source_code}, timeout=timeout
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        # every non-empty line is one complete JSON frame
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def test_execute_stream_frames(http_client: httpx.Client):
+    frames = _stream_frames(
+        http_client,
+        "import sys\nprint('first', flush=True)\nprint('oops', file=sys.stderr, flush=True)\nprint('second')\n",
+    )
+
+    assert [frame["type"] for frame in frames].count("exit") == 1
+    assert frames[-1]["type"] == "exit"
+    assert frames[-1]["exit_code"] == 0
+    assert {frame["type"] for frame in frames[:-1]} <= {"stdout", "stderr"}
+    stdout = "".join(frame["data"] for frame in frames if frame["type"] == "stdout")
+    stderr = "".join(frame["data"] for frame in frames if frame["type"] == "stderr")
+    assert stdout == "first\nsecond\n"
+    assert "oops" in stderr
+
+
+def test_execute_stream_exit_code(http_client: httpx.Client):
+    frames = _stream_frames(http_client, "import sys\nprint('bye')\nsys.exit(3)\n")
+
+    assert frames[-1]["type"] == "exit"
+    assert frames[-1]["exit_code"] == 3
+
+
+def test_execute_stream_timeout(http_client: httpx.Client):
+    # closing both pipes must not let the process outlive the executor's 60 s deadline
+    frames = _stream_frames(
+        http_client,
+        "import os, time\nprint('started', flush=True)\nos.close(1)\nos.close(2)\ntime.sleep(300)\n",
+        timeout=180,
+    )
+
+    assert frames[0] == {"type": "stdout", "data": "started\n"}
+    assert frames[-1]["type"] == "exit"
+    assert frames[-1]["exit_code"] == -1
+    assert any(
+        frame["type"] == "stderr" and "timed out" in frame["data"] for frame in frames
+    )
+
+
+def _execute_body_limit(config: Config) -> int:
+    from kubernetes.utils.quantity import parse_quantity
+
+    return int(parse_quantity(config.execute_body_size_limit))
+
+
+def test_execute_body_too_large(http_client: httpx.Client, config):
+    # the declared Content-Length alone is enough to reject the request
+    body = b" " * (_execute_body_limit(config) + 1)
+    response = http_client.post(
+        "/v1/execute",
+        content=body,
+        headers={"content-type": "application/json"},
+        timeout=120,
+    )
+    assert response.status_code == 413
+    assert "Request body too large" in response.text
+
+
+def test_execute_chunked_body_too_large(http_client: httpx.Client, config):
+    limit = _execute_body_limit(config)
+
+    def chunks():
+        # a generator body is sent with Transfer-Encoding: chunked and no Content-Length
+        chunk = b" " * 65536
+        for _ in range(limit // len(chunk) + 2):
+            yield chunk
+
+    response = http_client.post(
+        "/v1/execute-stream",
+        content=chunks(),
+        headers={"content-type": "application/json"},
+        timeout=120,
+    )
+    assert response.status_code == 413
+    assert "Request body too large" in response.text
+
+
+@pytest.mark.parametrize(
+    "files",
+    [{"/workspace/a.txt\n": "abc"}, {"/workspace/a.txt": "abc\n"}],
+)
+@pytest.mark.parametrize("content_type", ["application/json", "text/plain"])
+def test_execute_rejects_trailing_newline_in_files(http_client: httpx.Client, files, content_type):
+    # canonical JSON bodies take the msgspec fast path, other content types the pydantic one
+    response = http_client.post(
+        "/v1/execute",
+        content=json.dumps({"source_code": "print(1)", "files": files}),
+        headers={"content-type": content_type},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+from code_interpreter.utils import file_meta
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    """Point file_meta at a fresh database so tests never touch the real file store"""
+    monkeypatch.setattr(file_meta, "_DB", tmp_path / "file_mgmt_db.sqlite3")
+    monkeypatch.setattr(file_meta, "_LOCAL", threading.local())
+    # the first connection creates the files table from file_meta._SCHEMA
+    yield
+    file_meta._conn().close()
+
+
+def _remaining(file_hash: str, chat_id: str, filename: str):
+    return file_meta.get_file_info(file_hash, chat_id, filename)["remaining_downloads"]
+
+
+def _expire_now(file_hash: str, chat_id: str, filename: str) -> None:
+    file_meta._conn().execute(
+        "UPDATE files SET expires_at = ? WHERE file_hash = ? AND chat_id = ? AND filename = ?;",
+        ((datetime.now() - timedelta(seconds=1)).isoformat(), file_hash, chat_id, filename),
+    )
+
+
+# ---------- register_many ---------------------------------------------------
+
+def test_register_many_returns_stored_info():
+    info = file_meta.register_many(
+        [("hash1", "a.txt"), ("hash2", "b.txt")],
+        chat_id="chat",
+        max_downloads=3,
+        expires_in="1h",
+    )
+
+    assert set(info) == {("hash1", "a.txt"), ("hash2", "b.txt")}
+    for (file_hash, filename), meta in info.items():
+        assert meta == file_meta.get_file_info(file_hash, "chat", filename)
+        assert meta["remaining_downloads"] == 3
+        assert datetime.fromisoformat(meta["expires_at"]) > datetime.now()
+
+
+def test_register_many_unlimited():
+    info = file_meta.register_many([("hash1", "a.txt")], chat_id="chat", max_downloads=0)
+
+    assert info[("hash1", "a.txt")]["remaining_downloads"] is None
+    assert info[("hash1", "a.txt")]["expires_at"] is None
+    assert _remaining("hash1", "chat", "a.txt") is None
+
+
+def test_register_many_overwrites_existing():
+    file_meta.register_many([("hash1", "a.txt")], chat_id="chat", max_downloads=1)
+    file_meta.register_many([("hash1", "a.txt")], chat_id="chat", max_downloads=5)
+
+    assert _remaining("hash1", "chat", "a.txt") == 5
+
+
+def test_register_many_rejects_empty_values():
+    with pytest.raises(TypeError):
+        file_meta.register_many([("hash1", "")], chat_id="chat")
+    with pytest.raises(TypeError):
+        file_meta.register_many([("hash1", "a.txt")], chat_id="")
+
+    with pytest.raises(FileNotFoundError):
+        file_meta.get_file_info("hash1", "chat", "a.txt")
+
+
+# ---------- check_and_decrement ----------------------------------------------
+
+def test_check_and_decrement_success():
+    file_meta.register("hash1", "chat", "a.txt", max_downloads=2)
+
+    file_meta.check_and_decrement("hash1", "chat", "a.txt")
+    assert _remaining("hash1", "chat", "a.txt") == 1
+    file_meta.check_and_decrement("hash1", "chat", "a.txt")
+    assert _remaining("hash1", "chat", "a.txt") == 0
+
+
+def test_check_and_decrement_exhausted():
+    file_meta.register("hash1", "chat", "a.txt", max_downloads=1)
+    file_meta.check_and_decrement("hash1", "chat", "a.txt")
+
+    with pytest.raises(PermissionError, match="Download limit reached"):
+        file_meta.check_and_decrement("hash1", "chat", "a.txt")
+    assert _remaining("hash1", "chat", "a.txt") == 0
+
+
+def test_check_and_decrement_unlimited():
+    file_meta.register("hash1", "chat", "a.txt")
+
+    for _ in range(3):
+        file_meta.check_and_decrement("hash1", "chat", "a.txt")
+    # remaining IS NULL means unlimited and is never decremented
+    assert _remaining("hash1", "chat", "a.txt") is None
+
+
+@pytest.mark.parametrize("max_downloads", [None, 3])
+def test_check_and_decrement_expired(max_downloads):
+    file_meta.register("hash1", "chat", "a.txt", max_downloads=max_downloads, expires_in="1h")
+    _expire_now("hash1", "chat", "a.txt")
+
+    with pytest.raises(PermissionError, match="expired"):
+        file_meta.check_and_decrement("hash1", "chat", "a.txt")
+    # expired rows are marked with remaining = 0 for cleanup
+    assert _remaining("hash1", "chat", "a.txt") == 0
+
+
+def test_check_and_decrement_unknown():
+    file_meta.register("hash1", "chat", "a.txt")
+
+    with pytest.raises(FileNotFoundError):
+        file_meta.check_and_decrement("hash1", "other_chat", "a.txt")
+    with pytest.raises(FileNotFoundError):
+        file_meta.check_and_decrement("missing", "chat", "a.txt")